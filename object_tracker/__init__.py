@@ -56,8 +56,8 @@ All rights reserved.
 This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree.
 """
 
-import inspect
 import logging
+import sys
 from typing import Dict, List, Optional
 
 from .exceptions import InitialStateMissingException, InvalidChangeLogOperationException
@@ -77,6 +77,26 @@ __all__ = [
 
 logger = logging.getLogger(__name__)
 
+_THIS_FILE = __file__
+_MISSING = object()
+
+
+def _walk_stack(frame):
+    """
+    Lazily walks the call stack starting at `frame`, yielding
+    (filename, lineno, function) tuples without reading any source files.
+    Frames from this module are skipped.
+
+    Nothing is walked until the generator is consumed, so a stack the
+    tracker discards costs only the generator object.
+    """
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if not _THIS_FILE.startswith(filename):
+            yield filename, frame.f_lineno, code.co_name
+        frame = frame.f_back
+
 
 class TrackerMixin:
     """
@@ -101,29 +121,38 @@ class TrackerMixin:
             The attribute holding the Tracker object. Default is `tracker`.
     """
 
+    __slots__ = ()
+
     tracker_attr: str = 'tracker'
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
-        logger.debug(f"Tracker initialized for {self}")
+        logger.debug("Tracker initialized for %s", self)
 
     def __track_changes(self, attr, value) -> None:
-        if attr == self.tracker_attr:
+        tracker_attr = self.tracker_attr
+        if attr == tracker_attr:
             return
 
-        tracker: Optional[Tracker] = getattr(self, self.tracker_attr, None)
+        # the tracker usually lives in the instance dict, skip the full getattr lookup
+        inst_dict = getattr(self, '__dict__', None)
+        tracker: Optional[Tracker] = inst_dict.get(tracker_attr) if inst_dict is not None else None
 
         if tracker is None:
-            return None
+            # slotted subclasses keep the tracker in a slot
+            tracker = getattr(self, tracker_attr, None)
+            if tracker is None:
+                return None
 
         if tracker.should_track(attr):
-            curr = getattr(self, attr, value)
+            # plain instance attributes skip the MRO walk, getattr covers class attrs, descriptors and slots
+            curr = inst_dict.get(attr, _MISSING) if inst_dict is not None else _MISSING
+            if curr is _MISSING:
+                curr = getattr(self, attr, value)
             stack = None
             if tracker.store_call_stack():
-                stack = filter(
-                    lambda f: not __file__.startswith(f.filename), inspect.stack()
-                )
-            tracker.track(attr=attr, old=curr, new=value, stack=stack)
+                stack = _walk_stack(sys._getframe(1))
+            tracker.track(attr, curr, value, stack)
 
         return
 
@@ -144,6 +173,7 @@ def track(
     stack_trace: bool = True,
     tracker_attribute: str = 'tracker',
     changes_only: bool = False,
+    snapshot_mode: str = 'deep',
 ):
     """
     Decorator for tracking attribute changes in a class.
@@ -166,7 +196,7 @@ def track(
 
     Args:
         *attributes: 
-            The attributes to track.
+            The attributes to track. Default is all attributes.
 
         observers (List[ObserverType]):
                 The list of global observers called to notify any attribute change.
@@ -189,29 +219,50 @@ def track(
             Whether to track only changes to attributes or all assignments.
             Default is False.
 
+        snapshot_mode (str, optional):
+            How the initial state is copied, one of 'deep', 'shallow' or 'pickle'.
+            Default is 'deep'.
+
     Returns:
         The decorated class with attribute tracking.
     """
+    # frozen once for O(1) membership tests, no attributes means every attribute is tracked
+    tracked_attrs = frozenset(attributes) if attributes else None
+    # interned so the tracker_attr guard in TrackerMixin compares by identity
+    tracker_attr = sys.intern(tracker_attribute or TrackerMixin.tracker_attr)
+
     def decorator(cls):
         class Tracked(TrackerMixin, cls):
             def __init__(self, *args, **kwargs):
                 super().__init__(*args, **kwargs)
-                self.tracker_attr = tracker_attribute or self.tracker_attr
+                self.tracker_attr = tracker_attr
                 setattr(
                     self,
                     self.tracker_attr, 
                     Tracker(
                         initial_state=self,
-                        attributes=attributes,
+                        attributes=tracked_attrs,
                         observers=observers,
                         attribute_observer_map=attribute_observer_map,
                         auto_notify=auto_notify,
                         stack_trace=stack_trace,
                         changes_only=changes_only,
+                        snapshot_mode=snapshot_mode,
                     ),
                 )
 
+        if tracked_attrs is not None:
+            def __setattr__(self, attr, value) -> None:
+                # the tracked attributes are fixed by the decorator, untracked ones skip the mixin
+                if attr in tracked_attrs:
+                    self._TrackerMixin__track_changes(attr, value)
+                super(TrackerMixin, self).__setattr__(attr, value)
+
+            Tracked.__setattr__ = __setattr__
+
         Tracked.__name__ = cls.__name__
+        # lets pickle find the decorated class under the original name
+        Tracked.__qualname__ = cls.__qualname__
         Tracked.__module__ = cls.__module__
         Tracked.__doc__ = cls.__doc__
         return Tracked
@@ -6,10 +6,14 @@ This source code is licensed under the BSD-style license found in the LICENSE fi
 """
 
 import copy
+import linecache
+import sys
 import textwrap
-from typing import List, Optional, Set
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from collections import namedtuple
-from datetime import datetime, timezone
+from itertools import compress
+from datetime import datetime, timedelta, timezone
 from object_tracker.exceptions import InvalidChangeLogOperationException
 
 
@@ -19,18 +23,66 @@ cyan = lambda x: f"\033[96m{x}\033[0m"
 gray = lambda x: f"\033[90m{x}\033[0m"
 normal = lambda x: f"\033[0m{x}\033[0m"
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_time_ns = time.time_ns
+
+# exact types only, subclasses may carry mutable state
+_IMMUTABLE_TYPES = frozenset((int, float, complex, bool, str, bytes, type(None)))
+
+
+def _safe_copy(value):
+    """
+    Returns a deepcopy of the value, or the value itself if it cannot be mutated.
+    Containers like tuples go through deepcopy, which already returns them as-is
+    when all their items are immutable.
+    """
+    if type(value) in _IMMUTABLE_TYPES:
+        return value
+    return copy.deepcopy(value)
+
+
+def _to_datetime(ts_ns: int) -> datetime:
+    """
+    Converts nanoseconds since the epoch to a UTC datetime, datetime only holds microseconds
+    """
+    return _EPOCH + timedelta(microseconds=ts_ns // 1000)
+
+
+def _stack_to_dict(stack) -> Optional[List[dict]]:
+    return [frame.to_dict() for frame in stack] if stack is not None else None
+
+
+def _intern(attr):
+    """
+    Interns string attribute names so comparisons against them hit the identity fast path.
+    Keys tracked through __setitem__ need not be strings and are returned unchanged.
+    """
+    return sys.intern(attr) if type(attr) is str else attr
+
 
 class Frame(namedtuple('Frame', ['filename', 'lineno', 'function', 'code'])):
     """
     The Frame class is a named tuple that represents a single frame in the stack trace.
+
+    Accepts either an `inspect.FrameInfo` or a lightweight (filename, lineno, function) tuple.
+    For the latter, the source line is resolved through `linecache`, which caches file reads.
     """
+    __slots__ = ()
+
     def __new__(cls, frame):
+        if hasattr(frame, 'code_context'):
+            filename, lineno, function = frame.filename, frame.lineno, frame.function
+            code = frame.code_context[0].strip() if frame.code_context else None
+        else:
+            filename, lineno, function = frame
+            code = linecache.getline(filename, lineno).strip() or None
+
         return super().__new__(
             cls,
-            filename=frame.filename,
-            lineno=frame.lineno,
-            function=frame.function,
-            code=frame.code_context[0].strip() if frame.code_context else None
+            filename=filename,
+            lineno=lineno,
+            function=function,
+            code=code
         )
     
     def to_dict(self) -> dict:
@@ -41,26 +93,46 @@ class Frame(namedtuple('Frame', ['filename', 'lineno', 'function', 'code'])):
             'code': self.code
         }
 
+    def __reduce__(self):
+        # rebuild from the stored fields, __new__ expects a frame
+        return tuple.__new__, (type(self), tuple(self))
+
     def __str__(self):
         return f"{self.filename}: {self.lineno}, {self.function}\n{self.code}"
 
 
-class Entry(namedtuple('Entry', ['attr', 'old', 'new', 'timestamp', 'stack'])):
+class Entry(namedtuple('Entry', ['attr', 'old', 'new', 'ts_ns', 'stack'])):
     """
     The Entry class is a named tuple that represents a single log entry in the ChangeLog.
+
+    The time of the change is stored as integer nanoseconds since the epoch (`ts_ns`),
+    the `timestamp` datetime is only built when it is read.
     """
-    def __new__(cls, attr, old, new, stack: Optional[List[Frame]] = None):
+    __slots__ = ()
+
+    def __new__(cls, attr, old, new, stack: Optional[List[Frame]] = None, ts_ns: Optional[int] = None):
         if stack:
             stack = [Frame(frame) for frame in stack]
 
-        return super().__new__(
-            cls,
-            attr=attr,
-            old=old,
-            new=new,
-            timestamp=datetime.now(timezone.utc),
-            stack=stack
-        )
+        if ts_ns is None:
+            ts_ns = _time_ns()
+
+        # positional tuple construction, skips the namedtuple keyword handling on every push
+        return tuple.__new__(cls, (attr, old, new, ts_ns, stack))
+
+    def __reduce__(self):
+        # rebuild from the stored fields, __new__ would re-stamp the entry
+        return tuple.__new__, (type(self), tuple(self))
+
+    @property
+    def timestamp(self) -> datetime:
+        return _to_datetime(self.ts_ns)
+
+    def _asdict(self) -> dict:
+        # timestamp is no longer a field, keep it in the dict form
+        result = super()._asdict()
+        result['timestamp'] = self.timestamp
+        return result
 
     def to_dict(self) -> dict:
         return {
@@ -68,11 +140,12 @@ class Entry(namedtuple('Entry', ['attr', 'old', 'new', 'timestamp', 'stack'])):
             'old': self.old,
             'new': self.new,
             'timestamp': self.timestamp.isoformat(),
-            'stack': [frame.to_dict() for frame in self.stack]
+            'stack': _stack_to_dict(self.stack)
         }
     
     def is_a_change(self) -> bool:
-        return self.old != self.new
+        # identity first, unchanged scalars are not copied so they are usually the same object
+        return self.old is not self.new and self.old != self.new
 
 
 class ChangeLog:
@@ -86,6 +159,8 @@ class ChangeLog:
 
     - push(attr, old, new, stack=None): Pushes a new entry to the log.
 
+    - push_many(items): Pushes (attr, old, new) entries to the log in one go.
+
     - filter(*attrs, changes_only=False): Filters the log based on the given attributes.
 
     - exclude(*attrs, changes_only=False): Excludes the given attributes from the log.
@@ -102,10 +177,14 @@ class ChangeLog:
 
     - get_unique_attributes(): Returns all attributes in the log.
 
-    - has_changed(attr): Checks if any attribute of the object has been changed by verifying against the log.
+    - has_changed(attr=None): Checks if the attribute (or any attribute) has been changed by verifying against the log.
 
     - reset_buffer(): Resets the buffer.
 
+    The `log` list must only be changed through push() and push_many(). Attribute names are
+    indexed alongside it, entries added or removed directly are picked up by a full reindex
+    on the next query, entries replaced in place are not.
+
     Eg.
 
         The `tracker` obj has the `log` attribute which is an instance of the `ChangeLog` class.
@@ -120,8 +199,14 @@ class ChangeLog:
     """
 
     def __init__(self) -> None:
+        # mutated in place only, Tracker keeps a reference to this list
         self.log: List[Entry] = []
-        self.buffer: List[Entry] = []
+        # entries selected by filter/exclude, None when no filter is applied
+        self.buffer: Optional[List[Entry]] = None
+        # attribute names of self.log stored column-wise, so scans on attr skip the entries
+        self._attrs: List[str] = []
+        # attr -> entries of that attribute in log order, changes are only classified when queried
+        self._entries_by_attr: Dict[str, List[Entry]] = {}
 
     def __str__(self) -> str:
         return f"ChangeLog: {len(self.log)}"
@@ -133,34 +218,58 @@ class ChangeLog:
         return iter(self.log)
 
     def to_dict(self) -> List[dict]:
-        return [entry.to_dict() for entry in self.log]
+        # same output as Entry.to_dict, built inline to skip a method call per entry
+        return [
+            {
+                'attr': attr,
+                'old': old,
+                'new': new,
+                'timestamp': _to_datetime(ts_ns).isoformat(),
+                'stack': _stack_to_dict(stack)
+            }
+            for attr, old, new, ts_ns, stack in self.log
+        ]
     
     def reset_buffer(self):
-        if self.buffer:
-            self.buffer = []
+        self.buffer = None
 
     def get_selected_logs(self) -> List[Entry]:
-        logs = self.buffer if self.buffer else self.log
+        logs = self.log if self.buffer is None else self.buffer
         self.reset_buffer()
         return logs
 
     def apply_filters(self, attrs=None, exclude=False, changes_only=False) -> 'ChangeLog':
         """
         applies filters on the log and saves it in the buffer
+
+        attrs is a collection of attribute names, a single name is also accepted
         """
-        if attrs and not isinstance(attrs, (list, tuple, set)):
+        if isinstance(attrs, str):
+            # a bare string would otherwise be iterated character by character
+            attrs = (attrs,)
+
+        if attrs and not isinstance(attrs, (list, tuple, set, frozenset)):
             raise InvalidChangeLogOperationException(
                 "filter/exclude method needs a sequence of attributes as arguments"
             )
 
+        self._sync_index()
+        logs = self.log
+
         if attrs:
+            attrs = frozenset(_intern(attr) for attr in attrs)
             if exclude:
-                self.buffer = [entry for entry in self.log if entry.attr not in attrs]
+                logs = [entry for entry, attr in zip(logs, self._attrs) if attr not in attrs]
             else:
-                self.buffer = [entry for entry in self.log if entry.attr in attrs]
+                # selector mask built and applied in C, no bytecode runs per entry
+                logs = list(compress(logs, map(attrs.__contains__, self._attrs)))
 
         if changes_only:
-            self.buffer = [entry for entry in self.buffer if entry.is_a_change()]
+            # is_a_change() inlined, saves a method call per entry
+            logs = [entry for entry in logs if entry.old is not entry.new and entry.old != entry.new]
+
+        if logs is not self.log:
+            self.buffer = logs
 
         return self
 
@@ -180,66 +289,117 @@ class ChangeLog:
             raise InvalidChangeLogOperationException("exclude method needs atleast one attribute")
         return self.apply_filters(attrs, True, changes_only)
     
+    # first/last/count select the logs inline rather than through get_selected_logs()
+
     def first(self) -> Optional[Entry]:
-        logs = self.get_selected_logs()
+        logs = self.log if self.buffer is None else self.buffer
+        self.buffer = None
         return logs[0] if logs else None
 
     def last(self) -> Optional[Entry]:
-        logs = self.get_selected_logs()
+        logs = self.log if self.buffer is None else self.buffer
+        self.buffer = None
         return logs[-1] if logs else None
     
     def all(self) -> List[Entry]:
         return self.get_selected_logs()
 
     def count(self) -> int:
-        return len(self.get_selected_logs())
+        logs = self.log if self.buffer is None else self.buffer
+        self.buffer = None
+        return len(logs)
 
     def push(self, attr, old, new, stack=None) -> None:
         """
         Pushes a new entry to the log
         """
-        self.log.append(
-            Entry(
-                attr=attr, 
-                old=copy.deepcopy(old), 
-                new=copy.deepcopy(new),
-                stack=stack
-            )
-        )
+        # positional, push runs once per tracked change
+        self._append(Entry(_intern(attr), _safe_copy(old), _safe_copy(new), stack))
+
+    def push_many(self, items: Iterable[Tuple[str, Any, Any]]) -> None:
+        """
+        Pushes (attr, old, new) entries to the log, all sharing a single timestamp
+        """
+        ts_ns = _time_ns()
+        append = self._append
+        for attr, old, new in items:
+            append(Entry(_intern(attr), _safe_copy(old), _safe_copy(new), ts_ns=ts_ns))
+
+    def _append(self, entry: Entry) -> None:
+        # no value comparison here, old/new may be expensive or unsafe to compare
+        attr = entry.attr
+        self._attrs.append(attr)
+        entries = self._entries_by_attr.get(attr)
+        if entries is None:
+            self._entries_by_attr[attr] = [entry]
+        else:
+            entries.append(entry)
+        self.log.append(entry)
+
+    def _sync_index(self) -> None:
+        # cheap guard against direct edits of self.log, see the class docstring
+        if len(self._attrs) != len(self.log):
+            self._reindex()
+
+    def _reindex(self) -> None:
+        """
+        Rebuilds the attribute column and the per-attribute index from the log in a single pass
+        """
+        attrs: List[str] = []
+        entries_by_attr: Dict[str, List[Entry]] = {}
+        for entry in self.log:
+            attr = entry.attr
+            attrs.append(attr)
+            entries = entries_by_attr.get(attr)
+            if entries is None:
+                entries_by_attr[attr] = [entry]
+            else:
+                entries.append(entry)
+
+        self._attrs = attrs
+        self._entries_by_attr = entries_by_attr
 
     def get_unique_attributes(self) -> Set[str]:
         """
         Returns all attributes in the log
         """
+        if self.buffer is None:
+            self._sync_index()
+            return set(self._entries_by_attr)
         log = self.get_selected_logs()
-        return set([entry.attr for entry in log])
+        return {entry.attr for entry in log}
     
     def get_first_log_for_attribute(self, attr, reverse=False):
         """
-        Helper function to get a log entry.
+        Helper function to get the first (or last, if reverse) log entry
+        that changed the value of an attribute.
         """
-        range_func = reversed if reverse else iter
-        for i in range_func(range(len(self.log))):
-            if self.log[i].attr != attr:
-                continue
-            if self.log[i].is_a_change():
-                return self.log[i]
+        self._sync_index()
+        entries = self._entries_by_attr.get(attr)
+        if not entries:
+            return None
+        for entry in (reversed(entries) if reverse else entries):
+            if entry.old is not entry.new and entry.old != entry.new:
+                return entry
         return None
     
-    def has_changed(self, attr) -> bool:
+    def has_changed(self, attr=None) -> bool:
         """
         Checks if any attribute of the object has been changed by verifying against the log
+
+        Without attr, checks every attribute in the log
         """
-        first = self.get_first_log_for_attribute(attr)
-        last = self.get_first_log_for_attribute(attr, reverse=True)
+        if attr is None:
+            self._sync_index()
+            return any(self._attribute_changed(attr) for attr in self._entries_by_attr)
+        return self._attribute_changed(attr)
 
-        if not first and not last:
+    def _attribute_changed(self, attr) -> bool:
+        first = self.get_first_log_for_attribute(attr)
+        if first is None:
             return False
-        if not first or not last:
-            return True
-        if first.old != last.new:
-            return True
-        return False
+        last = self.get_first_log_for_attribute(attr, reverse=True)
+        return first.old != last.new
 
     def replay(self):
         """
@@ -253,7 +413,8 @@ class ChangeLog:
             formatted_val = f"'{green(log.new)}'" if is_str else green(log.new)
             text = f"{divider}\n{yellow(log.attr)} = {formatted_val}\n"
 
-            for i, frame in enumerate(log.stack):
+            # entries pushed without a stack (stack_trace off, push_many) show only the change
+            for i, frame in enumerate(log.stack or ()):
                 if i == 0:
                     text += textwrap.indent(
                         f"\n{frame.filename}: {frame.lineno} - {frame.function}\n{cyan(frame.code)}\n", '    '
@@ -5,16 +5,60 @@ All rights reserved.
 This source code is licensed under the BSD-style license found in the LICENSE file in the root directory of this source tree.
 """
 
+import io
 import logging
-from copy import deepcopy
-from typing import Dict, List, Any, Optional
+import pickle
+from copy import copy, deepcopy
+from types import MappingProxyType
+from typing import Callable, Dict, FrozenSet, Iterable, List, Any, Mapping, Optional, Tuple
 
 from object_tracker.exceptions import InitialStateMissingException
-from object_tracker.changelog import ChangeLog
+from object_tracker.changelog import ChangeLog, Entry, _intern
 from object_tracker.types import ObserverType
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+# shared by every Tracker without attribute observers, never mutated: it is only exposed through
+# a read-only view and add_observer swaps in a new dict
+_EMPTY_MAP: Dict[str, Tuple[ObserverType, ...]] = {}
+
+SNAPSHOT_MODES = ('deep', 'shallow', 'pickle')
+
+
+class _SnapshotPickler(pickle.Pickler):
+    def __init__(self, file, keep) -> None:
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.keep = keep
+
+    def persistent_id(self, obj) -> Optional[int]:
+        return 0 if obj is self.keep else None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, keep) -> None:
+        super().__init__(file)
+        self.keep = keep
+
+    def persistent_load(self, pid) -> Any:
+        return self.keep
+
+
+def _pickle_copy(obj, keep) -> Any:
+    """
+    Copies obj with a pickle round-trip. `keep` is passed by reference
+    instead of being pickled, like the deepcopy memo does for the tracker.
+    """
+    buffer = io.BytesIO()
+    _SnapshotPickler(buffer, keep).dump(obj)
+    buffer.seek(0)
+    return _SnapshotUnpickler(buffer, keep).load()
+
+
+def _observer_map(attribute_observer_map) -> Dict[str, Tuple[ObserverType, ...]]:
+    if not attribute_observer_map:
+        return _EMPTY_MAP
+    return {_intern(attr): tuple(attr_observers) for attr, attr_observers in attribute_observer_map.items()}
 
 
 class Tracker:
@@ -40,6 +84,41 @@ class Tracker:
     ```
     """
 
+    __slots__ = (
+        '_log',
+        '_push',
+        '_log_entries',
+        '_attributes',
+        '_attrs_set',
+        '_track_all',
+        '_observers',
+        '_attribute_observer_map',
+        '_notify',
+        '_auto_notify',
+        '_snapshotting',
+        'stack_trace',
+        'changes_only',
+        'snapshot_mode',
+        'initial_state',
+        '__weakref__',
+    )
+
+    _log: ChangeLog
+    _push: Callable[..., None]
+    _log_entries: List[Entry]
+    _attributes: Optional[Iterable[str]]
+    _attrs_set: FrozenSet[str]
+    _track_all: bool
+    _observers: Tuple[ObserverType, ...]
+    _attribute_observer_map: Dict[str, Tuple[ObserverType, ...]]
+    _notify: Callable[..., None]
+    _auto_notify: bool
+    _snapshotting: bool
+    stack_trace: bool
+    changes_only: bool
+    snapshot_mode: str
+    initial_state: Any
+
     def __init__(
         self,
         initial_state: Any = None,
@@ -49,6 +128,7 @@ class Tracker:
         auto_notify: bool = True,
         stack_trace: bool = True,
         changes_only: bool = False,
+        snapshot_mode: str = 'deep',
     ) -> None:
         """
         Initializes the Tracker instance.
@@ -56,6 +136,8 @@ class Tracker:
         Args:
             initial_state (any):
                 The initial state of the object to be tracked. Default is None.
+                If attributes are given, only those are kept in the snapshot, and
+                has_attribute_changed(attr, obj) raises ValueError for any other attribute.
 
             attributes (List[str]): 
                 The attributes to track. Default is None ie. all attributes are tracked.
@@ -79,21 +161,34 @@ class Tracker:
                 Whether to track only the attributes that have changed.
                 Default is False.
 
+            snapshot_mode (str):
+                How the initial state is copied, one of 'deep', 'shallow' or 'pickle'.
+                'shallow' is much cheaper for large objects, but in-place changes to mutable
+                attribute values (eg. appending to a list) are not detected.
+                'pickle' is a faster deep copy for picklable objects.
+                Default is 'deep'.
+
         Attributes:
             log (ChangeLog):
                 The log to store attribute changes.
         """
         
-        self.log = ChangeLog() # init query log
-        self.attributes = attributes # if it is None -> track all attributes
-        self.observers = observers or []
-        self.auto_notify = auto_notify
-        self.attribute_observer_map = attribute_observer_map or {}
+        self.log = ChangeLog() # init query log, see the log setter
+        self.attributes = attributes # if it is None -> track all attributes, see the attributes setter
+        # stored as tuples, see the observers/attribute_observer_map setters
+        self._observers = tuple(observers) if observers else ()
+        self._attribute_observer_map = _observer_map(attribute_observer_map)
+        self._auto_notify = auto_notify
+        self._rebuild_notify()
         self.stack_trace = stack_trace
         self.changes_only = changes_only
+        if snapshot_mode not in SNAPSHOT_MODES:
+            raise ValueError(f"snapshot_mode must be one of {SNAPSHOT_MODES}, got {snapshot_mode!r}")
+        self.snapshot_mode = snapshot_mode
+        self._snapshotting = False
         # needed when this Tracker class is used as a standalone class
-        self.initial_state = deepcopy(initial_state) if initial_state else None
-        logger.debug(f"Tracker instance created: {self}")
+        self.initial_state = self._snapshot(initial_state) if initial_state is not None else None
+        logger.debug("Tracker instance created: %s", self)
 
     def __str__(self) -> str:
         return self.log.__str__()
@@ -102,11 +197,127 @@ class Tracker:
         return self.log.__repr__()
     
     def __len__(self) -> int:
-        return len(self.log.log)
+        return len(self._log_entries)
+
+    @property
+    def log(self) -> ChangeLog:
+        return self._log
+
+    @log.setter
+    def log(self, log: ChangeLog) -> None:
+        self._log = log
+        self._push = log.push # bound once, track() runs on every attribute change
+        self._log_entries = log.log # the list is only ever mutated in place
+
+    @property
+    def attributes(self) -> Optional[Iterable[str]]:
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, attributes: Optional[Iterable[str]]) -> None:
+        self._attributes = attributes
+        # precomputed for should_track(), which runs on every attribute change
+        self._track_all = attributes is None
+        self._attrs_set = frozenset(map(_intern, attributes)) if attributes is not None else frozenset()
+
+    @property
+    def auto_notify(self) -> bool:
+        return self._auto_notify
 
-    def _call_observers(self, attr, old, new, observers: List[ObserverType]) -> None:
-        for observer in observers:
+    @auto_notify.setter
+    def auto_notify(self, auto_notify: bool) -> None:
+        self._auto_notify = auto_notify
+        self._rebuild_notify()
+
+    @property
+    def observers(self) -> Tuple[ObserverType, ...]:
+        return self._observers
+
+    @observers.setter
+    def observers(self, observers: Optional[List[ObserverType]]) -> None:
+        self._observers = tuple(observers) if observers else ()
+        self._rebuild_notify()
+
+    @property
+    def attribute_observer_map(self) -> Mapping[str, Tuple[ObserverType, ...]]:
+        # read-only, in-place edits would bypass _rebuild_notify. Use the setter or add/remove_observer
+        return MappingProxyType(self._attribute_observer_map)
+
+    @attribute_observer_map.setter
+    def attribute_observer_map(self, attribute_observer_map: Optional[Dict[str, List[ObserverType]]]) -> None:
+        self._attribute_observer_map = _observer_map(attribute_observer_map)
+        self._rebuild_notify()
+
+    def add_observer(self, observer: ObserverType, attr: Optional[str] = None) -> None:
+        """
+        Adds a global observer, or an observer for a specific attribute if attr is given
+        """
+        if attr is None:
+            self._observers += (observer,)
+        else:
+            attr = _intern(attr)
+            if self._attribute_observer_map is _EMPTY_MAP:
+                self._attribute_observer_map = {}
+            self._attribute_observer_map[attr] = self._attribute_observer_map.get(attr, ()) + (observer,)
+        self._rebuild_notify()
+
+    def remove_observer(self, observer: ObserverType, attr: Optional[str] = None) -> None:
+        """
+        Removes a global observer, or an observer of a specific attribute if attr is given
+        Raises ValueError if the observer is not registered.
+        """
+        observers = self._observers if attr is None else self._attribute_observer_map.get(attr, ())
+        if observer not in observers:
+            raise ValueError(f"{observer} is not an observer")
+
+        index = observers.index(observer)
+        observers = observers[:index] + observers[index + 1:]
+
+        if attr is None:
+            self._observers = observers
+        elif observers:
+            self._attribute_observer_map[attr] = observers
+        else:
+            del self._attribute_observer_map[attr]
+        self._rebuild_notify()
+
+    def _rebuild_notify(self) -> None:
+        """
+        Picks the observer dispatch for track() once, instead of checking
+        auto_notify and which observers exist on every change.
+
+        The plain function is stored and called with self, a bound method
+        in a slot of self would keep every Tracker in a reference cycle.
+        """
+        cls = type(self)
+        if not self._auto_notify:
+            self._notify = cls._notify_none
+        elif cls.notify_observers is not Tracker.notify_observers:
+            # an overridden notify_observers runs on every change, as it did before the dispatch
+            self._notify = cls.notify_observers
+        elif self._attribute_observer_map and self._observers:
+            self._notify = cls.notify_observers
+        elif self._attribute_observer_map:
+            self._notify = cls._notify_attribute_observers
+        elif self._observers:
+            self._notify = cls._notify_common_observers
+        else:
+            self._notify = cls._notify_none
+
+    def _notify_attribute_observers(self, attr, old, new) -> None:
+        attr_observers = self._attribute_observer_map.get(attr)
+        if attr_observers:
+            for observer in attr_observers:
+                observer(attr, old, new)
+            logger.debug("Attribute Observers notified for change in %s", attr)
+
+    def _notify_common_observers(self, attr, old, new) -> None:
+        for observer in self._observers:
             observer(attr, old, new)
+        logger.debug("Common Observers notified for change in %s", attr)
+
+    def _notify_none(self, attr, old, new) -> None:
+        return
 
     def notify_observers(self, attr, old, new) -> None:
         """
@@ -114,22 +325,23 @@ class Tracker:
 
         if auto_notify is False, this will have to be invoked manually.
         """
-        if self.attribute_observer_map:
-            observers = self.attribute_observer_map.get(attr, [])
-            self._call_observers(attr, old, new, observers)
-            logger.debug(f"Attribute Observers notified for change in {attr}")
+        attr_observers = self._attribute_observer_map.get(attr)
+        if attr_observers:
+            for observer in attr_observers:
+                observer(attr, old, new)
+            logger.debug("Attribute Observers notified for change in %s", attr)
         
-        if self.observers:
-            self._call_observers(attr, old, new, self.observers)
-            logger.debug(f"Common Observers notified for change in {attr}")
+        observers = self._observers
+        if observers:
+            for observer in observers:
+                observer(attr, old, new)
+            logger.debug("Common Observers notified for change in %s", attr)
 
     def should_track(self, attr) -> bool:
         """
         Checks if the attribute can be tracked
         """
-        if self.attributes is None:
-            return True
-        return attr in self.attributes
+        return not self._snapshotting and (self._track_all or attr in self._attrs_set)
     
     def store_call_stack(self) -> bool:
         """
@@ -137,13 +349,49 @@ class Tracker:
         """
         return self.stack_trace
 
+    def _deep_copy(self, obj) -> Any:
+        # the tracker is usually an attribute of obj, it (and its log) is kept out of the copy
+        if self.snapshot_mode == 'pickle':
+            return _pickle_copy(obj, self)
+        return deepcopy(obj, {id(self): self})
+
+    def _snapshot(self, obj) -> Any:
+        # copying obj may run its __setattr__ (eg. a __setstate__ using setattr) with this
+        # tracker attached, those assignments must not end up in the log
+        self._snapshotting = True
+        try:
+            return self._copy_state(obj)
+        finally:
+            self._snapshotting = False
+
+    def _copy_state(self, obj) -> Any:
+        shallow = self.snapshot_mode == 'shallow'
+        if self._track_all and not shallow:
+            return self._deep_copy(obj)
+
+        snapshot = copy(obj)
+        state = getattr(snapshot, '__dict__', None)
+        if state is None:
+            # nothing to filter (eg. slotted objects), copy the whole object
+            return snapshot if shallow else self._deep_copy(obj)
+
+        # new dicts are assigned below, copy() may share __dict__ with obj (eg. __setstate__ assigning self.__dict__)
+        if self._track_all:
+            object.__setattr__(snapshot, '__dict__', dict(state))
+            return snapshot
+
+        # keep only the tracked attributes, so untracked values are neither copied nor kept alive
+        kept = {attr: state[attr] for attr in self._attrs_set if attr in state}
+        object.__setattr__(snapshot, '__dict__', kept if shallow else self._deep_copy(kept))
+        return snapshot
+
     def set_initial_state(self, obj) -> None:
         """
-        creates a deepcopy of the current object 
+        creates a copy of the current object, see snapshot_mode 
             -> needed when tracker is used independently without a mixin for __setattr__
         """
-        self.initial_state = deepcopy(obj)
-        logger.debug(f"Initial state set for {self}")
+        self.initial_state = self._snapshot(obj)
+        logger.debug("Initial state set for %s", self)
 
     def to_dict(self) -> List[dict]:
         """
@@ -154,10 +402,15 @@ class Tracker:
     def has_attribute_changed(self, attr, obj=None) -> bool:
         """
         Checks if an attribute has changed by verifying against the log
+
+        If obj is provided, it is compared with the initial_state. Only tracked attributes
+        are kept in the initial_state, so a ValueError is raised for any other attribute.
         """
-        if obj:
-            if not self.initial_state:
+        if obj is not None:
+            if self.initial_state is None:
                 raise InitialStateMissingException()
+            if not self.should_track(attr):
+                raise ValueError(f"{attr!r} is not tracked, its initial state is not kept")
             return getattr(self.initial_state, attr, None) != getattr(obj, attr, None)
 
         return self.log.has_changed(attr)
@@ -167,21 +420,48 @@ class Tracker:
         Checks if any attribute of the object has been changed by verifying against the log
 
         If obj is provided, it will compare the object with the initial_state. If not, it will check the log
+        When tracking specific attributes, only those are compared.
         """
-        if obj:
-            if not self.initial_state:
+        if obj is not None:
+            initial_state = self.initial_state
+            if initial_state is None:
                 raise InitialStateMissingException()
-            return obj.__dict__ != self.initial_state.__dict__
 
-        attrs = self.log.get_unique_attributes()
-        return any([self.log.has_changed(attr) for attr in attrs])
+            if self._track_all:
+                return obj.__dict__ != initial_state.__dict__
+
+            for attr in self._attrs_set:
+                old = getattr(initial_state, attr, _MISSING)
+                new = getattr(obj, attr, _MISSING)
+                if old is not new and old != new:
+                    return True
+            return False
+
+        return self.log.has_changed()
     
     def track(self, attr, old, new, stack=None) -> None:
         """
         Tracks an attribute change. Untracked if the old and new values are the same
         """
-        if self.changes_only and old == new:
+        if self.changes_only and (old is new or old == new):
             return
-        self.log.push(attr=attr, old=old, new=new, stack=stack)
-        if self.auto_notify:
-            self.notify_observers(attr, old, new)
+        self._push(attr, old, new, stack)
+        # a no-op when auto_notify is off, see _rebuild_notify
+        self._notify(self, attr, old, new)
+
+    def bulk_track(self, changes: Iterable[Tuple[str, Any, Any]]) -> None:
+        """
+        Tracks several (attr, old, new) changes at once. They are pushed to the log
+        in one go, sharing a single timestamp, and observers are notified in order.
+        No call stack is stored for these entries, even with stack_trace on.
+        """
+        if self.changes_only:
+            changes = [(attr, old, new) for attr, old, new in changes if not (old is new or old == new)]
+        else:
+            changes = list(changes)
+
+        self.log.push_many(changes)
+        # a no-op when auto_notify is off, see _rebuild_notify
+        notify = self._notify
+        for attr, old, new in changes:
+            notify(self, attr, old, new)
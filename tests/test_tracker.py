@@ -2,8 +2,21 @@
 python -m unittest tests.test_tracker -v
 """
 
+import copy
+import gc
+import pickle
 import unittest
-from object_tracker import InitialStateMissingException, track, Tracker, TrackerMixin
+import weakref
+from datetime import datetime, timedelta, timezone
+from object_tracker import (
+    ChangeLog,
+    Entry,
+    InitialStateMissingException,
+    InvalidChangeLogOperationException,
+    track,
+    Tracker,
+    TrackerMixin,
+)
 
 def observer(attr, old, new):
     return attr, old, new
@@ -56,6 +69,147 @@ class TestTracker(unittest.TestCase):
         self.assertEqual(user.tracker.log.exclude('age').count(), 2)
         self.assertEqual(user.tracker.log.log[0].attr, 'name')
 
+    def test_push_does_not_compare_values(self):
+        class Unordered:
+            def __eq__(self, other):
+                raise TypeError("ambiguous comparison")
+            __ne__ = __eq__
+
+        user = User("A", 100)
+        user.age = Unordered()
+        user.age = Unordered()
+        self.assertEqual(len(user.tracker), 2)
+        self.assertFalse(user.tracker.has_attribute_changed('name'))
+
+    def test_entry_timestamp(self):
+        before = datetime.now(timezone.utc)
+        user = User("A", 100)
+        user.name = "B"
+        entry = user.tracker.log.last()
+        self.assertIsInstance(entry.ts_ns, int)
+        self.assertEqual(entry.timestamp.tzinfo, timezone.utc)
+        self.assertLessEqual(before - timedelta(seconds=1), entry.timestamp)
+        self.assertEqual(entry.to_dict()['timestamp'], entry.timestamp.isoformat())
+        self.assertEqual(entry._asdict()['timestamp'], entry.timestamp)
+
+    def test_push_many(self):
+        tracker = Tracker()
+        tracker.log.push_many([('name', 'A', 'B'), ('age', 10, 10), ('name', 'B', 'C')])
+        self.assertEqual(tracker.log.count(), 3)
+        self.assertEqual(tracker.log.filter('name').last().new, 'C')
+        self.assertEqual(len({entry.ts_ns for entry in tracker.log}), 1)
+        self.assertEqual(len(list(tracker.log.replay())), 3)
+        self.assertTrue(tracker.has_attribute_changed('name'))
+        self.assertFalse(tracker.has_attribute_changed('age'))
+
+    def test_direct_log_append(self):
+        user = User("A", 100)
+        user.name = "B"
+        user.tracker.log.log.append(Entry('age', 100, 20))
+        self.assertEqual(user.tracker.log.filter('age').count(), 1)
+        self.assertEqual(user.tracker.log.get_unique_attributes(), {'name', 'age'})
+        self.assertTrue(user.tracker.has_attribute_changed('age'))
+
+    def test_replace_log(self):
+        user = User("A", 100)
+        user.name = "B"
+        user.tracker.log = ChangeLog()
+        self.assertEqual(len(user.tracker), 0)
+        user.name = "C"
+        self.assertEqual(len(user.tracker.log), 1)
+        self.assertEqual(len(user.tracker), 1)
+        self.assertEqual(user.tracker.log.first().new, "C")
+
+    def test_reassign_attributes(self):
+        tracker = Tracker()
+        tracker.attributes = ['name']
+        self.assertTrue(tracker.should_track('name'))
+        self.assertFalse(tracker.should_track('age'))
+        tracker.attributes = None
+        self.assertTrue(tracker.should_track('age'))
+
+    def test_overridden_notify_observers(self):
+        calls = []
+
+        class RecordingTracker(Tracker):
+            def notify_observers(self, attr, old, new) -> None:
+                calls.append((attr, old, new))
+                super().notify_observers(attr, old, new)
+
+        tracker = RecordingTracker()
+        tracker.track('name', 'A', 'B')
+        tracker.add_observer(observer)
+        tracker.track('name', 'B', 'C')
+        self.assertEqual(calls, [('name', 'A', 'B'), ('name', 'B', 'C')])
+
+    def test_tracker_freed_without_gc(self):
+        tracker = Tracker(observers=[observer], attribute_observer_map={'name': [observer]})
+        ref = weakref.ref(tracker)
+        gc.disable()
+        try:
+            del tracker
+            self.assertIsNone(ref())
+        finally:
+            gc.enable()
+
+    def test_attribute_observer_map_is_read_only(self):
+        tracker = Tracker()
+        with self.assertRaises(TypeError):
+            tracker.attribute_observer_map['name'] = (observer,)
+        self.assertEqual(Tracker().attribute_observer_map, {})
+
+    def test_filter_without_matches(self):
+        user = User("A", 100)
+        user.name = "B"
+        self.assertEqual(user.tracker.log.filter('unknown').count(), 0)
+        self.assertEqual(user.tracker.log.filter('unknown').all(), [])
+        self.assertEqual(user.tracker.log.count(), 1)
+
+    def test_copy_entries(self):
+        user = User("A", 100)
+        user.name = "B"
+        entry = user.tracker.log.last()
+        self.assertFalse(hasattr(entry, '__dict__'))
+        self.assertEqual(pickle.loads(pickle.dumps(entry)), entry)
+        self.assertEqual(copy.deepcopy(entry), entry)
+        user.tracker.set_initial_state(user)
+        self.assertEqual(user.tracker.initial_state.tracker.log.last(), entry)
+
+    def test_values_are_copied(self):
+        user = User("A", [1])
+        user.age = [1, 2]
+        user.age.append(3)
+        self.assertEqual(user.tracker.log.last().old, [1])
+        self.assertEqual(user.tracker.log.last().new, [1, 2])
+
+    def test_apply_filters(self):
+        user = User("A", 100)
+        user.name = "B"
+        user.age = 20
+        self.assertEqual(user.tracker.log.apply_filters('name').count(), 1)
+        self.assertEqual(user.tracker.log.apply_filters(frozenset(['name'])).count(), 1)
+        self.assertEqual(user.tracker.log.apply_filters('name', exclude=True).first().attr, 'age')
+        self.assertRaises(InvalidChangeLogOperationException, user.tracker.log.apply_filters, 1)
+
+    def test_copy_tracker(self):
+        user = User("A", 100)
+        user.name = "B"
+        self.assertFalse(hasattr(user.tracker, '__dict__'))
+        for tracker in (copy.deepcopy(user.tracker), pickle.loads(pickle.dumps(user.tracker))):
+            self.assertEqual(tracker.to_dict(), user.tracker.to_dict())
+            tracker.track('age', 100, 20)
+            self.assertEqual(len(tracker), 2)
+            self.assertEqual(len(user.tracker), 1)
+
+    def test_bulk_track(self):
+        calls = []
+        tracker = Tracker(observers=[lambda *args: calls.append(args)], changes_only=True)
+        tracker.bulk_track(iter([('name', 'A', 'B'), ('age', 10, 10), ('name', 'B', 'C')]))
+        self.assertEqual(len(tracker), 2)
+        self.assertEqual(calls, [('name', 'A', 'B'), ('name', 'B', 'C')])
+        self.assertTrue(tracker.has_attribute_changed('name'))
+        self.assertFalse(tracker.has_attribute_changed('age'))
+
     def test_tracker_only(self):
         user = UntrackedUser("A", 100)
         tracker = Tracker()
@@ -67,6 +221,81 @@ class TestTracker(unittest.TestCase):
         self.assertTrue(tracker.has_changed(user))
         self.assertTrue(tracker.has_attribute_changed('name', user))
 
+    def test_shallow_snapshot(self):
+        user = UntrackedUser("A", [1])
+        tracker = Tracker(initial_state=user, snapshot_mode='shallow')
+        self.assertIsNot(tracker.initial_state, user)
+        self.assertIs(tracker.initial_state.age, user.age)
+        self.assertFalse(tracker.has_changed(user))
+        user.name = "B"
+        self.assertTrue(tracker.has_changed(user))
+        self.assertTrue(tracker.has_attribute_changed('name', user))
+        self.assertFalse(tracker.has_attribute_changed('age', user))
+
+    def test_pickle_snapshot(self):
+        user = User("A", [1])
+        tracker = user.tracker = Tracker(snapshot_mode='pickle')
+        tracker.set_initial_state(user)
+        self.assertIsNot(tracker.initial_state.age, user.age)
+        self.assertIs(tracker.initial_state.tracker, user.tracker)
+        user.age.append(2)
+        self.assertTrue(tracker.has_attribute_changed('age', user))
+        self.assertRaises(ValueError, Tracker, snapshot_mode='copy')
+
+    def test_tracked_attributes_snapshot(self):
+        user = UntrackedUser("A", [1])
+        tracker = Tracker(initial_state=user, attributes=['age'])
+        self.assertFalse(hasattr(tracker.initial_state, 'name'))
+        self.assertRaises(ValueError, tracker.has_attribute_changed, 'name', user)
+        self.assertIsNot(tracker.initial_state.age, user.age)
+        user.name = "B"
+        self.assertFalse(tracker.has_changed(user))
+        user.age.append(2)
+        self.assertTrue(tracker.has_changed(user))
+
+    def test_tracked_attributes_snapshot_keeps_object(self):
+        class SharedState:
+            def __init__(self):
+                self.name = "A"
+                self.other = [1]
+
+            def __setstate__(self, state):
+                self.__dict__ = state
+
+        obj = SharedState()
+        tracker = Tracker(initial_state=obj, attributes=['name'])
+        self.assertEqual(obj.__dict__, {'name': "A", 'other': [1]})
+        self.assertFalse(tracker.has_changed(obj))
+
+        tracker = Tracker(initial_state=obj, snapshot_mode='shallow')
+        self.assertIsNot(tracker.initial_state.__dict__, obj.__dict__)
+        obj.name = "B"
+        self.assertTrue(tracker.has_changed(obj))
+
+    def test_tracked_attributes_snapshot_slotted(self):
+        class Slotted:
+            __slots__ = ('items',)
+
+            def __init__(self):
+                self.items = [1]
+
+        obj = Slotted()
+        tracker = Tracker(initial_state=obj, attributes=['items'])
+        obj.items.append(2)
+        self.assertTrue(tracker.has_attribute_changed('items', obj))
+
+    def test_falsy_object(self):
+        class Bag(list):
+            pass
+
+        bag = Bag()
+        bag.name = "A"
+        tracker = Tracker(initial_state=bag)
+        self.assertFalse(tracker.has_attribute_changed('name', bag))
+        bag.name = "B"
+        self.assertTrue(tracker.has_attribute_changed('name', bag))
+        self.assertRaises(InitialStateMissingException, Tracker().has_attribute_changed, 'name', bag)
+
 
 class TestObjectTracker(unittest.TestCase):
     def setUp(self):
@@ -106,6 +335,33 @@ class TestObjectTracker(unittest.TestCase):
         self.assertTrue(user.tracker.has_changed())
         self.assertTrue(user.tracker.has_attribute_changed('name'))
 
+    def test_initial_state_shares_tracker(self):
+        user = User("A", 100)
+        user.name = "B"
+        user.tracker.set_initial_state(user)
+        self.assertIs(user.tracker.initial_state.tracker, user.tracker)
+        self.assertFalse(user.tracker.has_changed(user))
+        user.age = 20
+        self.assertTrue(user.tracker.has_changed(user))
+        self.assertTrue(user.tracker.has_attribute_changed('age', user))
+        self.assertFalse(user.tracker.has_attribute_changed('name', user))
+
+    def test_snapshot_is_not_tracked(self):
+        class RestoredUser(TrackerMixin):
+            def __init__(self, name) -> None:
+                self.tracker = Tracker()
+                self.name = name
+
+            def __setstate__(self, state):
+                for attr, value in state.items():
+                    setattr(self, attr, value)
+
+        user = RestoredUser("A")
+        user.name = "B"
+        user.tracker.set_initial_state(user)
+        self.assertEqual(len(user.tracker), 2)
+        self.assertFalse(user.tracker.has_changed(user))
+
     def test_ignore_init(self):
         user = User("A", 100)
         assert user.tracker.has_changed() is False
@@ -121,6 +377,19 @@ class TestObjectTracker(unittest.TestCase):
 
         Example("A", 50)
 
+    def test_slotted_subclass(self):
+        class SlottedUser(TrackerMixin):
+            __slots__ = ('tracker', 'name')
+
+            def __init__(self, name) -> None:
+                self.tracker = Tracker()
+                self.name = name
+
+        user = SlottedUser("A")
+        user.name = "B"
+        self.assertEqual(user.tracker.log.first().old, "A")
+        self.assertTrue(user.tracker.has_attribute_changed('name'))
+
 
 class TestTrackingDecorator(unittest.TestCase):
     """
@@ -183,3 +452,151 @@ class TestTrackingDecorator(unittest.TestCase):
         self.assertFalse(user.custom_tracker.has_changed())
         user.name = "B"
         self.assertTrue(user.custom_tracker.has_changed())
+
+    def test_stack_trace(self):
+        user = self.TrackedUser("A", 100)
+        user.name = "B"
+        frame = user.tracker.log.last().stack[0]
+        self.assertEqual(frame.filename, __file__)
+        self.assertEqual(frame.function, 'test_stack_trace')
+        self.assertEqual(frame.code, 'user.name = "B"')
+
+    def test_filter_changes_only(self):
+        user = self.TrackedUser("A", 100)
+        user.name = "B"
+        user.name = "B"
+        user.age = 20
+        self.assertEqual(user.tracker.log.filter('name').count(), 2)
+        self.assertEqual(user.tracker.log.filter('name', changes_only=True).count(), 1)
+        self.assertEqual(user.tracker.log.exclude('name', changes_only=True).count(), 1)
+        self.assertEqual(user.tracker.log.apply_filters(changes_only=True).count(), 2)
+
+    def test_changed_back(self):
+        user = self.TrackedUser("A", 100)
+        user.name = "A"
+        self.assertFalse(user.tracker.has_attribute_changed('name'))
+        user.name = "B"
+        self.assertTrue(user.tracker.has_attribute_changed('name'))
+        user.name = "A"
+        self.assertFalse(user.tracker.has_attribute_changed('name'))
+        self.assertFalse(user.tracker.has_changed())
+        self.assertEqual(user.tracker.log.get_first_log_for_attribute('name').new, "B")
+        self.assertEqual(user.tracker.log.get_first_log_for_attribute('name', reverse=True).new, "A")
+
+    def test_untracked_attribute(self):
+        user = self.TrackedUser("A", 100)
+        user.email = "a@example.com"
+        user.email = "b@example.com"
+        self.assertEqual(user.email, "b@example.com")
+        self.assertEqual(len(user.tracker), 0)
+        user.age = 20
+        self.assertEqual(user.tracker.log.last().attr, 'age')
+
+    def test_track_all_attributes(self):
+        @track()
+        class AnyUser:
+            def __init__(self, name, age) -> None:
+                self.name = name
+                self.age = age
+
+        user = AnyUser("A", 100)
+        self.assertIsNone(user.tracker.attributes)
+        user.email = "a@example.com"
+        self.assertEqual(user.tracker.log.last().attr, 'email')
+        self.assertIsInstance(self.TrackedUser("A", 100).tracker.attributes, frozenset)
+
+    def test_changes_only(self):
+        @track('name', changes_only=True)
+        class ChangedUser:
+            def __init__(self, name) -> None:
+                self.name = name
+
+        user = ChangedUser("A")
+        user.name = "A"
+        self.assertEqual(len(user.tracker), 0)
+        user.name = "B"
+        self.assertEqual(len(user.tracker), 1)
+        self.assertIsNotNone(user.tracker.log.last().stack)
+
+        compared = []
+
+        class Value:
+            def __eq__(self, other):
+                compared.append(other)
+                return False
+
+        user.name = Value()
+        self.assertEqual(len(compared), 1)
+
+    def test_observers(self):
+        calls = []
+
+        @track('name', 'age', observers=[lambda *args: calls.append(('all',) + args)],
+               attribute_observer_map={'name': [lambda *args: calls.append(('name',) + args)]})
+        class ObservedUser:
+            def __init__(self, name, age) -> None:
+                self.name = name
+                self.age = age
+
+        user = ObservedUser("A", 100)
+        user.name = "B"
+        user.age = 20
+        self.assertEqual(calls, [
+            ('name', 'name', 'A', 'B'),
+            ('all', 'name', 'A', 'B'),
+            ('all', 'age', 100, 20),
+        ])
+
+    def test_to_dict(self):
+        @track('name', stack_trace=False)
+        class PlainUser:
+            def __init__(self, name) -> None:
+                self.name = name
+
+        user = PlainUser("A")
+        user.name = "B"
+        self.assertEqual(user.tracker.to_dict(), [entry.to_dict() for entry in user.tracker.log])
+        self.assertIsNone(user.tracker.to_dict()[0]['stack'])
+
+        user = self.TrackedUser("A", 100)
+        user.name = "B"
+        self.assertEqual(user.tracker.to_dict(), [entry.to_dict() for entry in user.tracker.log])
+        self.assertEqual(user.tracker.to_dict()[0]['stack'][0]['function'], 'test_to_dict')
+
+    def test_toggle_auto_notify(self):
+        calls = []
+        user = self.TrackedUser("A", 100)
+        user.tracker.observers = [lambda *args: calls.append(args)]
+        user.tracker.auto_notify = False
+        user.name = "B"
+        self.assertEqual(calls, [])
+        user.tracker.auto_notify = True
+        user.name = "C"
+        self.assertEqual(calls, [('name', 'B', 'C')])
+
+    def test_add_remove_observer(self):
+        calls = []
+        common = lambda *args: calls.append(('all',) + args)
+        on_name = lambda *args: calls.append(('name',) + args)
+
+        user = self.TrackedUser("A", 100)
+        user.tracker.observers = []
+        user.name = "B"
+        self.assertEqual(calls, [])
+
+        user.tracker.add_observer(common)
+        user.tracker.add_observer(on_name, attr='name')
+        user.name = "C"
+        user.age = 20
+        self.assertEqual(calls, [
+            ('name', 'name', 'B', 'C'),
+            ('all', 'name', 'B', 'C'),
+            ('all', 'age', 100, 20),
+        ])
+
+        user.tracker.remove_observer(common)
+        user.tracker.remove_observer(on_name, attr='name')
+        self.assertEqual(user.tracker.attribute_observer_map, {})
+        self.assertRaises(ValueError, user.tracker.remove_observer, common)
+        user.name = "D"
+        self.assertEqual(len(calls), 3)